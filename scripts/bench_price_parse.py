@@ -0,0 +1,82 @@
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from pricing import extract_max_price  # noqa: E402
+
+# Hand-written alternative: keyword find + digit loop over the ASCII bytes
+KEYWORDS = (b"below", b"under", b"less than", b"<=", b"<")
+WHITESPACE = b" \t\n\r\f\v"
+DIGITS = b"0123456789"
+
+
+def _is_word(c: int) -> bool:
+    return chr(c).isalnum() or c == 95  # "_"
+
+
+def extract_max_price_scan(query: str):
+    b = query.lower().encode()
+    end = len(b)
+
+    # Same leftmost-first order as re.finditer over the alternation
+    hits = []
+    for kw in KEYWORDS:
+        i = b.find(kw)
+        while i >= 0:
+            hits.append((i, len(kw)))
+            i = b.find(kw, i + 1)
+    hits.sort()
+
+    for i, length in hits:
+        j = i + length
+        while j < end and b[j] in WHITESPACE:
+            j += 1
+        k = j
+        while k < end and b[k] in DIGITS:
+            k += 1
+        if k == j:
+            continue
+        n = int(b[j:k])
+
+        t = k
+        while t < end and b[t] in WHITESPACE:
+            t += 1
+        if t < end and b[t] == ord("k"):
+            u = t + 1
+            if b[u:u + 2] == b"rs":
+                u += 2
+            elif b[u:u + 1] == b"r":
+                u += 1
+            if u == end or not _is_word(b[u]):
+                return float(n * 1000)
+        if n >= 100:
+            return float(n)
+    return None
+
+
+QUERIES = [
+    "phones under 15k with good camera",
+    "cheap earbuds",
+    "laptop below 50000 for students",
+    "something nice for my mom",
+    "under 50 and below 500",
+    "Under 10 K",
+    "less than 2 kg",
+    "under 500rs",
+    "<  1500",
+]
+
+
+def main(number: int = 50000):
+    for q in QUERIES:
+        assert extract_max_price(q) == extract_max_price_scan(q), q
+
+    t_re = timeit.timeit(lambda: [extract_max_price(q) for q in QUERIES], number=number)
+    t_scan = timeit.timeit(lambda: [extract_max_price_scan(q) for q in QUERIES], number=number)
+    print(f"regex: {t_re:.3f}s  byte scan: {t_scan:.3f}s  ({len(QUERIES)} queries x {number})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from optimum.exporters.onnx import main_export
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+OUTPUT_DIR = "onnx"
+
+
+def main():
+    # Same as: optimum-cli export onnx --model <MODEL_NAME> --task feature-extraction onnx/
+    # Batch and sequence axes are exported as dynamic.
+    main_export(MODEL_NAME, output=OUTPUT_DIR, task="feature-extraction")
+    print(f"Exported {MODEL_NAME} to {OUTPUT_DIR}/model.onnx")
+
+    # Dynamic INT8 weights (activations quantized at runtime)
+    quantize_dynamic(
+        f"{OUTPUT_DIR}/model.onnx",
+        f"{OUTPUT_DIR}/model.int8.onnx",
+        weight_type=QuantType.QInt8,
+        op_types_to_quantize=["MatMul", "Attention"],
+    )
+    print(f"Quantized to {OUTPUT_DIR}/model.int8.onnx")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,84 +1,177 @@
+import html
 import os
 import re
-from typing import Optional, List, Dict, Any
+import time
+from functools import lru_cache
+from typing import Optional, List, Iterator
 
+import cpu_threads  # noqa: F401  (sets thread env vars before numpy/torch load)
+
+import numpy as np
+import requests
 import streamlit as st
+import tiktoken
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
 from endee import Endee
 
 from langchain_groq import ChatGroq
 
+from catalog import CATALOG_PATH, Catalog
+from encoder import load_encoder
+from pricing import extract_max_price
+
 INDEX_NAME = "quickcart_products"
-MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
+# Query caching: exact (normalized text) + semantic (cosine against recent queries)
+QUERY_CACHE_SIZE = 1024
+SEMANTIC_CACHE_SIZE = 256
+SEMANTIC_CACHE_THRESHOLD = 0.97
+RESULT_CACHE_SIZE = 256
+
+# Query expansion: paraphrases embedded together and averaged
+MAX_QUERY_VARIANTS = 4
+QUERY_MAX_SEQ_LENGTH = 64
+
+CARD_CSS = """
+<style>
+.qc-card { border: 1px solid rgba(128, 128, 128, 0.3); border-radius: 0.5rem; padding: 0.75rem 1rem; margin-bottom: 0.75rem; }
+.qc-card h3 { margin: 0 0 0.25rem 0; padding: 0; }
+.qc-card .qc-desc { margin: 0.25rem 0 0 0; font-size: 0.875rem; opacity: 0.7; }
+</style>
+"""
+
+# Groq prompt budget + answer caching (near-duplicate query, same products)
+RAG_MAX_ITEMS = 8
+RAG_CONTEXT_TOKEN_BUDGET = 800
+RAG_DESC_MAX_TOKENS = 40
+LLM_CACHE_SIZE = 100
+LLM_CACHE_TTL_SEC = 3600
+LLM_CACHE_THRESHOLD = 0.95
 
 # ---------- Helpers ----------
+@st.cache_resource
 def connect_index():
+    # Cached across reruns so the client's pooled keep-alive session is reused
     client = Endee()
     return client.get_index(name=INDEX_NAME)
 
 
-def embed_query(model, q: str) -> List[float]:
-    return model.encode([q], normalize_embeddings=True)[0].tolist()
+def query_index(index, **kwargs) -> List[dict]:
+    try:
+        return index.query(**kwargs)
+    except requests.exceptions.ConnectionError:
+        # A pooled connection may have been dropped server-side; retry once
+        return index.query(**kwargs)
+
 
+def normalize_query(q: str) -> str:
+    return " ".join(q.lower().split())
 
-def safe_price(meta: Dict[str, Any]) -> float:
-    p = meta.get("price", 0)
-    try:
-        return float(p)
-    except Exception:
-        return 0.0
 
+def expand_query(q: str) -> List[str]:
+    variants = [
+        q,
+        re.sub(r"\bunder\b", "below", q),
+        re.sub(r"\b(\d+)\s*k\b", r"\g<1>000", q),
+        q + " best rated",
+    ]
+    return list(dict.fromkeys(variants))[:MAX_QUERY_VARIANTS]  # dedupe, keep order
 
-def extract_max_price(query: str) -> Optional[float]:
-    q = query.lower().strip()
 
-    # "under 10k", "below 15k"
-    k_match = re.search(r"(below|under|less than|<=|<)\s*(\d+)\s*k", q)
-    if k_match:
-        return float(k_match.group(2)) * 1000
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _encode_cached(model, key: str) -> np.ndarray:
+    # All variants go through one batched forward pass; their mean is the query vector
+    vecs = model.encode(expand_query(key), batch_size=MAX_QUERY_VARIANTS, normalize_embeddings=True)
+    vec = vecs.mean(axis=0).astype(np.float32)
+    vec /= np.linalg.norm(vec)
+    vec.setflags(write=False)  # shared across callers via the LRU cache
+    return vec
 
-    # "under 10000", "below 15000"
-    num_match = re.search(r"(below|under|less than|<=|<)\s*(\d{3,7})", q)
-    if num_match:
-        return float(num_match.group(2))
 
-    return None
+def embed_query(model, q: str) -> np.ndarray:
+    """
+    Embed a user query with two cache layers:
+    - exact: same normalized text skips the transformer (LRU, process-wide)
+    - semantic: if a recent query in this session has cosine >= threshold,
+      reuse its vector so the retrieval cache below is hit as well
+    """
+    vec = _encode_cached(model, normalize_query(q))
+    cached = st.session_state.get("query_vecs")
 
+    if cached is None:
+        cached = vec[None, :]
+    else:
+        sims = cached @ vec
+        best = int(sims.argmax())
+        if sims[best] >= SEMANTIC_CACHE_THRESHOLD:
+            return cached[best]
+        cached = np.vstack([cached, vec])[-SEMANTIC_CACHE_SIZE:]
 
-def apply_filters(results: List[dict], max_price: Optional[float]) -> List[dict]:
+    st.session_state.query_vecs = cached
+    return vec
+
+
+def price_filter(max_price: Optional[float]) -> Optional[List[dict]]:
+    # Evaluated inside Endee, so top_k is filled with in-budget products only
     if max_price is None:
-        return results
-    return [r for r in results if safe_price(r.get("meta", {}) or {}) <= max_price]
+        return None
+    return [{"price": {"$range": [0, max_price]}}]
 
 
-def apply_sort(results: List[dict], sort_mode: str) -> List[dict]:
-    if sort_mode == "Price: Low to High":
-        return sorted(results, key=lambda r: safe_price((r.get("meta", {}) or {})))
-    if sort_mode == "Price: High to Low":
-        return sorted(results, key=lambda r: safe_price((r.get("meta", {}) or {})), reverse=True)
-    return results  # semantic relevance
+def cached_query(index, q_vec: np.ndarray, top_k: int, max_price: Optional[float]) -> List[dict]:
+    cache = st.session_state.setdefault("result_cache", {})
+    key = (np.round(q_vec, 4).tobytes(), top_k, max_price)
+
+    if key not in cache:
+        if len(cache) >= RESULT_CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+        # Endee validates the query vector as List[float], not an ndarray
+        cache[key] = query_index(index, vector=q_vec.tolist(), top_k=top_k, filter=price_filter(max_price))
+    return cache[key]
+
 
+@st.cache_resource(max_entries=1)
+def _load_catalog(path: str, mtime: float) -> Catalog:
+    # mtime is only part of the cache key: a re-ingest rewrites the file and forces a reload
+    return Catalog(path)
 
-def render_product_cards(results: List[dict]):
-    for r in results[:10]:
-        meta = r.get("meta", {}) or {}
-        name = meta.get("name", "N/A")
-        price = meta.get("price", "N/A")
-        category = meta.get("category", "N/A")
-        brand = meta.get("brand", "")
-        desc = meta.get("description", "")
 
-        with st.container(border=True):
-            st.markdown(f"### {name}")
-            st.markdown(f"**₹{price}**  |  **{category}**" + (f"  |  **{brand}**" if brand else ""))
-            if desc:
-                st.caption(desc)
+def load_catalog() -> Optional[Catalog]:
+    if not os.path.exists(CATALOG_PATH):
+        return None
+    return _load_catalog(CATALOG_PATH, os.path.getmtime(CATALOG_PATH))
+
+
+def apply_sort(idxs: np.ndarray, sort_mode: str, catalog: Catalog) -> np.ndarray:
+    if sort_mode == "Price: Low to High":
+        return idxs[np.argsort(catalog.price_num[idxs], kind="stable")]
+    if sort_mode == "Price: High to Low":
+        return idxs[np.argsort(-catalog.price_num[idxs], kind="stable")]
+    return idxs  # semantic relevance: prices are never needed
+
+
+def render_product_cards(products: List[dict]):
+    # One st.markdown for all cards instead of ~5 elements per card
+    parts = []
+    for p in products[:10]:
+        name = html.escape(str(p.get("name") or "N/A"))
+        price = html.escape(str(p.get("price") or "N/A"))
+        category = html.escape(str(p.get("category") or "N/A"))
+        brand = html.escape(str(p.get("brand") or ""))
+        desc = html.escape(str(p.get("description") or ""))
+
+        details = f"<b>₹{price}</b> &nbsp;|&nbsp; <b>{category}</b>" + (f" &nbsp;|&nbsp; <b>{brand}</b>" if brand else "")
+        parts.append(
+            f"<div class='qc-card'><h3>{name}</h3><div>{details}</div>"
+            + (f"<p class='qc-desc'>{desc}</p>" if desc else "")
+            + "</div>"
+        )
+
+    st.markdown("\n".join(parts), unsafe_allow_html=True)
 
 
-def fallback_answer(user_query: str, results: List[dict], max_price: Optional[float]) -> str:
-    if not results:
+def fallback_answer(user_query: str, products: List[dict], max_price: Optional[float]) -> str:
+    if not products:
         if max_price is not None:
             return f"I couldn't find products under ₹{int(max_price)}. Try increasing budget or changing query."
         return "I couldn't find relevant products. Try a different query."
@@ -89,34 +182,98 @@ def fallback_answer(user_query: str, results: List[dict], max_price: Optional[fl
         lines.append(f"Applied filter: **price <= ₹{int(max_price)}**")
     lines.append("")
     lines.append("**Top recommendations:**")
-    for i, r in enumerate(results[:3], start=1):
-        meta = r.get("meta", {}) or {}
-        lines.append(f"{i}. **{meta.get('name','N/A')}** (₹{meta.get('price','N/A')}, {meta.get('category','N/A')})")
+    for i, p in enumerate(products[:3], start=1):
+        lines.append(f"{i}. **{p.get('name') or 'N/A'}** (₹{p.get('price') or 'N/A'}, {p.get('category') or 'N/A'})")
     return "\n".join(lines)
 
 
-def groq_rag_answer(user_query: str, results: List[dict], max_price: Optional[float]) -> str:
+@lru_cache(maxsize=1)
+def get_token_encoder():
+    # Groq's Llama tokenizer differs, but cl100k is close enough for budgeting
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def build_rag_context(products: List[dict]):
     """
-    RAG-style answer:
+    Context lines in result order (at most RAG_MAX_ITEMS) until the token budget is spent.
+    Baseline fields only (name, price, category, description); descriptions are clipped.
+    Returns the context string and the products it covers.
+    """
+    enc = get_token_encoder()
+    lines, used, tokens = [], [], 0
+
+    for p in products[:RAG_MAX_ITEMS]:
+        name = str(p.get("name") or "")
+        desc = str(p.get("description") or "")
+
+        desc_tokens = enc.encode(desc)
+        if len(desc_tokens) > RAG_DESC_MAX_TOKENS:
+            desc = enc.decode(desc_tokens[:RAG_DESC_MAX_TOKENS]) + "…"
+
+        line = (
+            f"- name: {name}, price: {p.get('price') or ''}, "
+            f"category: {p.get('category') or ''}, description: {desc}"
+        )
+        n = len(enc.encode(line))
+        if lines and tokens + n > RAG_CONTEXT_TOKEN_BUDGET:
+            break
+        lines.append(line)
+        used.append(p)
+        tokens += n
+
+    return "\n".join(lines), used
+
+
+def llm_cache_get(q_vec: np.ndarray, ids: frozenset, max_price: Optional[float]) -> Optional[str]:
+    now = time.time()
+    cache = [e for e in st.session_state.get("llm_cache", []) if now - e[4] < LLM_CACHE_TTL_SEC]
+    st.session_state.llm_cache = cache
+    if not cache:
+        return None
+
+    sims = np.stack([e[0] for e in cache]) @ q_vec
+    for i in np.argsort(-sims):
+        if sims[i] < LLM_CACHE_THRESHOLD:
+            break
+        _, e_ids, e_price, response, _ = cache[i]
+        if e_ids == ids and e_price == max_price:
+            cache.append(cache.pop(i))  # most recently used goes last
+            return response
+    return None
+
+
+def llm_cache_put(q_vec: np.ndarray, ids: frozenset, max_price: Optional[float], response: str):
+    cache = st.session_state.setdefault("llm_cache", [])
+    cache.append((q_vec, ids, max_price, response, time.time()))
+    del cache[:-LLM_CACHE_SIZE]  # evict least recently used
+
+
+def groq_rag_stream(
+    user_query: str,
+    q_vec: np.ndarray,
+    products: List[dict],
+    max_price: Optional[float],
+) -> Iterator[str]:
+    """
+    RAG-style answer, streamed token by token:
     - Retrieval from Endee already done
     - We only send retrieved products as context to Groq
     - Groq generates a grounded recommendation response
+    - Answers are reused for near-duplicate queries over the same products
     """
     groq_key = os.getenv("GROQ_API_KEY", "").strip()
-    if not groq_key:
-        return fallback_answer(user_query, results, max_price)
-
-    if not results:
-        return fallback_answer(user_query, results, max_price)
+    if not groq_key or not products:
+        yield fallback_answer(user_query, products, max_price)
+        return
 
     # Prepare context from retrieved products
-    context_lines = []
-    for r in results[:8]:
-        meta = r.get("meta", {}) or {}
-        context_lines.append(
-            f"- name: {meta.get('name','')}, price: {meta.get('price','')}, category: {meta.get('category','')}, description: {meta.get('description','')}"
-        )
-    context = "\n".join(context_lines)
+    context, context_products = build_rag_context(products)
+
+    ids = frozenset(p["id"] for p in context_products)
+    cached = llm_cache_get(q_vec, ids, max_price)
+    if cached is not None:
+        yield cached
+        return
 
     budget_text = f"User budget: under ₹{int(max_price)}" if max_price is not None else "User budget: not specified"
 
@@ -146,7 +303,11 @@ Output format:
         groq_api_key=groq_key
     )
 
-    return llm.invoke(prompt).content
+    parts = []
+    for chunk in llm.stream(prompt):
+        parts.append(chunk.content)
+        yield chunk.content
+    llm_cache_put(q_vec, ids, max_price, "".join(parts))
 
 
 # ---------- Streamlit App ----------
@@ -155,13 +316,27 @@ load_dotenv()
 st.set_page_config(page_title="QuickCart Chat", page_icon="🛒", layout="wide")
 st.title("🛒 QuickCart Chat")
 st.caption("Chatbot UI. Semantic retrieval powered by Endee. AI response powered by Groq (optional).")
+# Re-sent on every script run on purpose: Streamlit rebuilds the page each
+# rerun, so a style block emitted only once per session would be dropped
+st.markdown(CARD_CSS, unsafe_allow_html=True)
 
 @st.cache_resource
 def load_model():
-    return SentenceTransformer(MODEL_NAME)
+    m = load_encoder()
+    m.max_seq_length = QUERY_MAX_SEQ_LENGTH  # chat queries are short; ingest keeps the full length
+
+    # Throwaway encode shaped like a real query batch, so lazy init / kernel
+    # selection happens here (once, cached) instead of on the first chat turn
+    m.encode(expand_query("warmup query under 10k"), batch_size=MAX_QUERY_VARIANTS, normalize_embeddings=True)
+    return m
 
 model = load_model()
 
+catalog = load_catalog()
+if catalog is None:
+    st.error(f"Product catalog {CATALOG_PATH} not found. Run ingest.py first.")
+    st.stop()
+
 # Connect to Endee
 try:
     index = connect_index()
@@ -201,23 +376,27 @@ if user_query and user_query.strip():
         max_price = extract_max_price(user_query)
 
         q_vec = embed_query(model, user_query)
-        results = index.query(vector=q_vec, top_k=top_k)
+        hits = cached_query(index, q_vec, top_k, max_price)
 
-        results = apply_filters(results, max_price)
-        results = apply_sort(results, sort_mode)
+        # Endee returns ids + scores; product details come from the catalog
+        idxs = apply_sort(catalog.indices(h["id"] for h in hits), sort_mode, catalog)
+        products = catalog.rows(idxs)
 
-        # AI answer
-        if use_ai:
-            reply = groq_rag_answer(user_query, results, max_price)
-        else:
-            reply = fallback_answer(user_query, results, max_price)
-
-        st.markdown(reply)
+        # Reserve the reply slot above the cards, render the cards (local, fast),
+        # then stream the Groq answer into the slot token by token.
+        reply_area = st.container()
 
         st.markdown("#### Results")
-        if results:
-            render_product_cards(results)
+        if products:
+            render_product_cards(products)
         else:
             st.info("No results after applying filters.")
 
+        with reply_area:
+            if use_ai:
+                reply = st.write_stream(groq_rag_stream(user_query, q_vec, products, max_price))
+            else:
+                reply = fallback_answer(user_query, products, max_price)
+                st.markdown(reply)
+
     st.session_state.messages.append({"role": "assistant", "content": reply})
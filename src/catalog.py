@@ -0,0 +1,29 @@
+from typing import Iterable, List
+
+import numpy as np
+import pyarrow.parquet as pq
+
+CATALOG_PATH = "data/products.parquet"
+
+
+class Catalog:
+    """
+    Product metadata from the Parquet sidecar written by ingest.py.
+    Endee only returns ids and scores; everything shown to the user is read here.
+    """
+
+    def __init__(self, path: str = CATALOG_PATH):
+        self.table = pq.read_table(path)
+        self.id_to_idx = {pid: i for i, pid in enumerate(self.table.column("id").to_pylist())}
+        self.price_num = self.table.column("price_num").to_numpy()
+
+    def indices(self, ids: Iterable[str]) -> np.ndarray:
+        # Row positions for the given ids, in order; ids missing from the sidecar are skipped
+        return np.fromiter(
+            (self.id_to_idx[i] for i in ids if i in self.id_to_idx),
+            dtype=np.int64,
+        )
+
+    def rows(self, idxs: np.ndarray) -> List[dict]:
+        # One columnar gather, then a single conversion to row dicts
+        return self.table.take(idxs).to_pylist()
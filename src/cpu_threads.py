@@ -0,0 +1,12 @@
+import os
+
+import psutil
+
+# Thread count for CPU inference. Import this module before numpy / torch /
+# onnxruntime so the BLAS and OpenMP pools pick it up instead of oversubscribing.
+# Physical cores by default; for MiniLM, 4-8 threads is usually the sweet spot,
+# so on big machines set OMP_NUM_THREADS explicitly to override.
+NUM_THREADS = int(os.environ.get("OMP_NUM_THREADS") or psutil.cpu_count(logical=False) or 1)
+
+os.environ.setdefault("OMP_NUM_THREADS", str(NUM_THREADS))
+os.environ.setdefault("MKL_NUM_THREADS", str(NUM_THREADS))
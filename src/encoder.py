@@ -0,0 +1,110 @@
+import os
+from typing import List, Optional
+
+from cpu_threads import NUM_THREADS
+
+import numpy as np
+import onnxruntime as ort
+import torch
+from sentence_transformers import SentenceTransformer
+from transformers import AutoTokenizer
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+ONNX_DIR = "onnx"
+ONNX_MODEL_PATH = os.path.join(ONNX_DIR, "model.onnx")
+ONNX_INT8_MODEL_PATH = os.path.join(ONNX_DIR, "model.int8.onnx")
+MAX_SEQ_LENGTH = 256
+
+# INT8 is only used if its embeddings stay within this cosine distance of FP32
+INT8_MAX_DRIFT = 1e-2
+SELF_TEST_QUERIES = [
+    "phones under 15000 with good camera",
+    "wireless earbuds with long battery",
+    "cheapest gaming headset",
+]
+
+
+class OnnxEncoder:
+    """
+    MiniLM served by ONNX Runtime instead of eager PyTorch.
+    Mirrors the parts of SentenceTransformer used by app.py / ingest.py.
+    """
+
+    def __init__(self, model_path: str = ONNX_MODEL_PATH, num_threads: int = NUM_THREADS):
+        so = ort.SessionOptions()
+        so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        so.intra_op_num_threads = num_threads
+
+        self.model_path = model_path
+        self.session = ort.InferenceSession(model_path, sess_options=so, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(ONNX_DIR, use_fast=True)  # Rust tokenizer
+        self.max_seq_length = MAX_SEQ_LENGTH  # same knob as SentenceTransformer.max_seq_length
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.session.get_outputs()[0].shape[-1]
+
+    def encode(self, texts: List[str], batch_size: int = 32, normalize_embeddings: bool = False, **_) -> np.ndarray:
+        out = []
+        for i in range(0, len(texts), batch_size):
+            enc = self.tokenizer(
+                texts[i:i + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feed = {k: np.asarray(v, dtype=np.int64) for k, v in enc.items() if k in self.input_names}
+            hidden = self.session.run(None, feed)[0]
+
+            # Mean pooling over real (non-padding) tokens
+            mask = enc["attention_mask"][..., None].astype(np.float32)
+            out.append((hidden * mask).sum(1) / np.maximum(mask.sum(1), 1e-9))
+
+        vecs = np.vstack(out).astype(np.float32)
+        if normalize_embeddings:
+            vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+        return vecs
+
+
+def int8_drift(int8: OnnxEncoder, fp32: OnnxEncoder) -> float:
+    a = int8.encode(SELF_TEST_QUERIES, normalize_embeddings=True)
+    b = fp32.encode(SELF_TEST_QUERIES, normalize_embeddings=True)
+    return float(1.0 - (a * b).sum(axis=1).min())
+
+
+def build_encoder(model_path: Optional[str], num_threads: int):
+    """
+    Rebuild an encoder another process already chose via load_encoder():
+    an OnnxEncoder for model_path, or SentenceTransformer when it is None.
+    No fallback message and no INT8 drift check.
+    """
+    if model_path is None:
+        torch.set_num_threads(num_threads)
+        return SentenceTransformer(MODEL_NAME)
+    return OnnxEncoder(model_path, num_threads)
+
+
+def load_encoder(num_threads: int = NUM_THREADS):
+    torch.set_num_threads(num_threads)
+    # Only settable once per process, before any inter-op work (module
+    # re-imports by Streamlit's watcher or earlier torch use would raise)
+    if torch.get_num_interop_threads() != 1:
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass
+
+    # Fall back to PyTorch until scripts/export_onnx.py has been run
+    if not os.path.exists(ONNX_MODEL_PATH):
+        print(f"{ONNX_MODEL_PATH} not found, using SentenceTransformer. Run scripts/export_onnx.py for faster inference.")
+        return SentenceTransformer(MODEL_NAME)
+
+    fp32 = OnnxEncoder(ONNX_MODEL_PATH, num_threads)
+    if os.path.exists(ONNX_INT8_MODEL_PATH):
+        int8 = OnnxEncoder(ONNX_INT8_MODEL_PATH, num_threads)
+        drift = int8_drift(int8, fp32)
+        if drift <= INT8_MAX_DRIFT:
+            return int8
+        print(f"INT8 model drift {drift:.4f} > {INT8_MAX_DRIFT}, using FP32 model.")
+    return fp32
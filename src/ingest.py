@@ -1,9 +1,23 @@
 import json
-from sentence_transformers import SentenceTransformer
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from cpu_threads import NUM_THREADS  # sets thread env vars before numpy/torch load
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 from endee import Endee, Precision
 
+from catalog import CATALOG_PATH
+from encoder import build_encoder, load_encoder
+
 INDEX_NAME = "quickcart_products"
-MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+BATCH_SIZE = 64
+UPSERT_BATCH_SIZE = 1000  # Endee caps a single upsert at 10k vectors
+PARALLEL_MIN_TEXTS = 2000  # below this, worker start-up costs more than it saves
+
+_worker_model = None
 
 def build_text(p: dict) -> str:
     return (
@@ -14,6 +28,74 @@ def build_text(p: dict) -> str:
         f"Description: {p.get('description','')}\n"
     )
 
+def parse_price(p: dict) -> float:
+    try:
+        return float(p.get("price") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def build_item(p: dict, vector: np.ndarray) -> dict:
+    price_num = parse_price(p)
+    return {
+        "id": p["id"],
+        "vector": vector.tolist(),  # Endee validates vectors as lists of floats
+        # No meta: product details live in the Parquet catalog (see write_catalog)
+        # Filterable fields, used by app.py to push the budget into index.query
+        "filter": {
+            "price": price_num,
+        },
+    }
+
+def write_catalog(products: list, path: str = CATALOG_PATH):
+    # Product metadata as columns, sorted by id; app.py and search.py read it via catalog.Catalog
+    table = pa.table({
+        "id": [str(p["id"]) for p in products],
+        "name": [p.get("name") for p in products],
+        "brand": [p.get("brand") for p in products],
+        "category": [p.get("category") for p in products],
+        "description": [p.get("description") for p in products],
+        "price": [None if p.get("price") is None else str(p["price"]) for p in products],  # for display
+        "price_num": pa.array([parse_price(p) for p in products], type=pa.float32()),
+    })
+    pq.write_table(table.sort_by("id"), path)
+
+def encode_sorted(model, texts: list) -> np.ndarray:
+    # Smart batching: encode in token-length order so each batch pads to
+    # similar lengths, then scatter rows back to the original order.
+    lengths = [len(ids) for ids in model.tokenizer(texts)["input_ids"]]
+    order = np.argsort(lengths, kind="stable")
+
+    out = np.empty((len(texts), model.get_sentence_embedding_dimension()), dtype=np.float32)
+    for i in range(0, len(texts), BATCH_SIZE):
+        idx = order[i:i + BATCH_SIZE]
+        out[idx] = model.encode([texts[j] for j in idx], batch_size=BATCH_SIZE, normalize_embeddings=True)
+    return out
+
+def _init_worker(model_path):
+    # One single-threaded copy of the parent's encoder per process; the pool
+    # provides the parallelism
+    global _worker_model
+    _worker_model = build_encoder(model_path, num_threads=1)
+
+def _encode_shard(texts: list) -> np.ndarray:
+    return encode_sorted(_worker_model, texts)
+
+def encode_parallel(model, texts: list) -> np.ndarray:
+    workers = NUM_THREADS
+    if workers < 2 or len(texts) < PARALLEL_MIN_TEXTS:
+        return encode_sorted(model, texts)
+
+    # Contiguous shards, so concatenating the results keeps the input order
+    shards = [[texts[i] for i in idx] for idx in np.array_split(np.arange(len(texts)), workers)]
+    model_path = getattr(model, "model_path", None)  # None -> SentenceTransformer fallback
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(model_path,),
+    ) as ex:
+        return np.vstack(list(ex.map(_encode_shard, shards)))
+
 def main():
     # Load products
     with open("data/products.json", "r", encoding="utf-8") as f:
@@ -23,7 +105,7 @@ def main():
         raise RuntimeError("data/products.json is empty. Add at least 1 product.")
 
     # Load embedding model
-    model = SentenceTransformer(MODEL_NAME)
+    model = load_encoder()
     dim = model.get_sentence_embedding_dimension()
 
     # Connect to Endee (defaults to http://localhost:8080)
@@ -43,27 +125,24 @@ def main():
 
     index = client.get_index(name=INDEX_NAME)
 
-    # Create vectors
+    # Create vectors: one contiguous float32 (N, dim) array
     texts = [build_text(p) for p in products]
-    vectors = model.encode(texts, normalize_embeddings=True).tolist()
-
-    # Upsert to Endee
-    payload = []
-    for p, v in zip(products, vectors):
-        payload.append({
-            "id": p["id"],
-            "vector": v,
-            "meta": {
-                "name": p.get("name"),
-                "brand": p.get("brand"),
-                "price": p.get("price"),
-                "category": p.get("category"),
-                "description": p.get("description"),
-            }
-        })
-
-    index.upsert(payload)
-    print(f"Upserted {len(payload)} products into Endee index '{INDEX_NAME}'.")
+    vectors = encode_parallel(model, texts)
+
+    # Upsert to Endee in chunks; per-row lists are only built for the current chunk
+    total = 0
+    for start in range(0, len(products), UPSERT_BATCH_SIZE):
+        payload = [
+            build_item(p, vectors[start + i])
+            for i, p in enumerate(products[start:start + UPSERT_BATCH_SIZE])
+        ]
+        index.upsert(payload)
+        total += len(payload)
+
+    print(f"Upserted {total} products into Endee index '{INDEX_NAME}'.")
+
+    write_catalog(products)
+    print(f"Wrote product catalog to {CATALOG_PATH}.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,37 @@
+import re
+from typing import Optional, Tuple
+
+# The word boundary only guards the "k" suffix ("2 kg" is not 2000), so
+# suffixed amounts like "500rs" / "15krs" still parse
+_PRICE_RE = re.compile(r"(?:below|under|less than|<=|<)\s*(?P<n>\d+)(?:\s*(?P<k>k)(?:rs?)?\b)?", re.IGNORECASE)
+
+
+def extract_max_price(query: str) -> Optional[float]:
+    # "under 10k", "below 15k" -> thousands; "under 10000" -> needs 3+ digits
+    # Kept as a regex: a hand-written keyword/digit byte scanner is consistently
+    # slower in CPython (see scripts/bench_price_parse.py); the pattern runs in C.
+    for m in _PRICE_RE.finditer(query):
+        n = int(m["n"])
+        if m["k"]:
+            return float(n * 1000)
+        if n >= 100:
+            return float(n)
+    return None
+
+
+# One scan answers both "sort by price?" and "descending?". Stems cover the
+# inflections the old substring check caught ("sorting", "pricing",
+# "costliest") while \b keeps words like "description" from matching "desc".
+_SORT_RE = re.compile(
+    r"\b(pric(?:e[sd]?|ing)|cost(?:s|l\w*)?|cheapest|expensive|sort(?:s|ed|ing)?"
+    r"|low to high|high to low|desc(?:ending)?)\b",
+    re.IGNORECASE,
+)
+_DESC_HITS = {"expensive", "high to low", "desc", "descending"}
+
+
+def classify_sort(q: str) -> Tuple[bool, bool]:
+    """Returns (is_price_sort_query, wants_desc_sort)."""
+    hits = {h.lower() for h in _SORT_RE.findall(q)}
+    desc = bool(hits & _DESC_HITS) or any(h.startswith("costl") for h in hits)  # costlier, costliest
+    return bool(hits), desc
@@ -1,26 +1,18 @@
-from sentence_transformers import SentenceTransformer
-from endee import Endee
-
-INDEX_NAME = "quickcart_products"
-MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-
+import cpu_threads  # noqa: F401  (sets thread env vars before numpy/torch load)
 
-def is_price_sort_query(q: str) -> bool:
-    q = q.lower()
-    keywords = [
-        "price", "cost", "cheapest", "expensive",
-        "low to high", "high to low", "sort"
-    ]
-    return any(k in q for k in keywords)
+import numpy as np
+from endee import Endee
 
+from catalog import CATALOG_PATH, Catalog
+from encoder import load_encoder
+from pricing import classify_sort
 
-def wants_desc_sort(q: str) -> bool:
-    q = q.lower()
-    return ("high to low" in q) or ("expensive" in q) or ("desc" in q) or ("descending" in q)
+INDEX_NAME = "quickcart_products"
 
 
 def main():
-    model = SentenceTransformer(MODEL_NAME)
+    model = load_encoder()
+    catalog = Catalog(CATALOG_PATH)
     client = Endee()
     index = client.get_index(name=INDEX_NAME)
 
@@ -40,23 +32,17 @@ def main():
         # Retrieve from Endee (top_k can be increased if you add more products)
         results = index.query(vector=q_vec, top_k=10)
 
-        if not results:
+        # Endee returns ids + scores; product details come from the catalog
+        idxs = catalog.indices(r["id"] for r in results)
+        if not len(idxs):
             print("\nNo matches found.")
             continue
 
         # Sort by price if the query asks for it
-        if is_price_sort_query(q):
-            desc = wants_desc_sort(q)
-
-            def price_key(r):
-                meta = r.get("meta", {}) or {}
-                price = meta.get("price", 0)
-                try:
-                    return float(price)
-                except Exception:
-                    return 0.0
-
-            results = sorted(results, key=price_key, reverse=desc)
+        is_sort, desc = classify_sort(q)
+        if is_sort:
+            prices = catalog.price_num[idxs]
+            idxs = idxs[np.argsort(-prices if desc else prices, kind="stable")]
 
             order_label = "High → Low" if desc else "Low → High"
             print(f"\nProducts sorted by price ({order_label}):")
@@ -64,12 +50,11 @@ def main():
             print("\nTop semantic matches:")
 
         # Print results
-        for r in results:
-            meta = r.get("meta", {}) or {}
-            name = meta.get("name", "N/A")
-            price = meta.get("price", "N/A")
-            category = meta.get("category", "N/A")
-            brand = meta.get("brand", "")
+        for p in catalog.rows(idxs):
+            name = p.get("name") or "N/A"
+            price = p.get("price") or "N/A"
+            category = p.get("category") or "N/A"
+            brand = p.get("brand") or ""
             brand_part = f" | {brand}" if brand else ""
             print(f"- {name}{brand_part} | ₹{price} | {category}")
 
@@ -0,0 +1,33 @@
+import pytest
+
+from pricing import extract_max_price
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("phones under 15k", 15000.0),
+        ("Under 10 K with good camera", 10000.0),
+        ("below 15000 camera", 15000.0),
+        ("under 500rs", 500.0),
+        ("under 15000rs", 15000.0),
+        ("under 15krs", 15000.0),
+        ("<= 999", 999.0),
+        ("under 50 and below 500", 500.0),
+    ],
+)
+def test_extracts_budget(query, expected):
+    assert extract_max_price(query) == expected
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "under 2 kg",  # a weight, not 2000
+        "under 99",  # too small to be a budget
+        "wireless earbuds",
+        "thunderbolt dock",
+    ],
+)
+def test_no_budget(query):
+    assert extract_max_price(query) is None
@@ -0,0 +1,25 @@
+import pytest
+
+from pricing import classify_sort
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("headphones sorted by price", (True, False)),
+        ("sorting by price low to high", (True, False)),
+        ("sorts phones", (True, False)),
+        ("pricing for speakers", (True, False)),
+        ("cheapest earbuds", (True, False)),
+        ("costs of laptops", (True, False)),
+        ("costliest watch", (True, True)),
+        ("most expensive phone", (True, True)),
+        ("price high to low", (True, True)),
+        ("sort desc", (True, True)),
+        ("Sort Descending", (True, True)),
+        ("speaker with a long description", (False, False)),
+        ("wireless earbuds", (False, False)),
+    ],
+)
+def test_classify_sort(query, expected):
+    assert classify_sort(query) == expected